@@ -3,16 +3,17 @@ from datetime import datetime
 from binance_trade_bot import backtest
 
 if __name__ == "__main__":
-    history = []
+    btc_start = bridge_start = None
     for manager in backtest(datetime(2021, 1, 1), datetime.now()):
         btc_value = manager.collate_coins("BTC")
         bridge_value = manager.collate_coins(manager.config.BRIDGE.symbol)
-        history.append((btc_value, bridge_value))
-        btc_diff = round((btc_value - history[0][0]) / history[0][0] * 100, 3)
-        bridge_diff = round((bridge_value - history[0][1]) / history[0][1] * 100, 3)
+        if btc_start is None:
+            btc_start, bridge_start = btc_value, bridge_value
+        btc_diff = (btc_value / btc_start - 1.0) * 100.0
+        bridge_diff = (bridge_value / bridge_start - 1.0) * 100.0
         print("------")
         print("TIME:", manager.datetime)
         print("BALANCES:", manager.balances)
-        print("BTC VALUE:", btc_value, f"({btc_diff}%)")
-        print(f"{manager.config.BRIDGE.symbol} VALUE:", bridge_value, f"({bridge_diff}%)")
+        print("BTC VALUE:", btc_value, f"({btc_diff:.3f}%)")
+        print(f"{manager.config.BRIDGE.symbol} VALUE:", bridge_value, f"({bridge_diff:.3f}%)")
         print("------")
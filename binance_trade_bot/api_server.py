@@ -7,7 +7,7 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager, joinedload
 
 from .config import Config
 from .database import Database
@@ -54,12 +54,13 @@ def value_history(coin: str = None):
 
         query = filter_period(query, CoinValue)
 
+        # Stream the rows instead of materialising the whole history at once
         if coin:
-            values: List[CoinValue] = query.filter(CoinValue.coin_id == coin).all()
+            values = query.filter(CoinValue.coin_id == coin).yield_per(1000)
             return jsonify([entry.info() for entry in values])
 
-        coin_values = groupby(query.all(), key=lambda cv: cv.coin)
-        return jsonify({coin.symbol: [entry.info() for entry in history] for coin, history in coin_values})
+        coin_values = groupby(query.yield_per(1000), key=lambda cv: cv.coin_id)
+        return jsonify({coin_id: [entry.info() for entry in history] for coin_id, history in coin_values})
 
 
 @app.route("/api/total_value_history")
@@ -99,6 +100,7 @@ def scouting_history():
         query = (
             session.query(ScoutHistory)
             .join(ScoutHistory.pair)
+            .options(contains_eager(ScoutHistory.pair))
             .filter(Pair.from_coin_id == coin)
             .order_by(ScoutHistory.datetime.asc())
         )
@@ -119,7 +121,7 @@ def current_coin():
 def current_coin_history():
     session: Session
     with db.db_session() as session:
-        query = session.query(CurrentCoin)
+        query = session.query(CurrentCoin).options(joinedload(CurrentCoin.coin))
 
         query = filter_period(query, CurrentCoin)
 
@@ -1,6 +1,8 @@
+import time
 from datetime import datetime
 from typing import Dict, List
 
+from cachetools import TTLCache
 from sqlalchemy.orm import Session
 
 from .binance_api_manager import BinanceAPIManager
@@ -11,6 +13,9 @@ from .models import Coin, CoinValue, Pair
 
 
 class AutoTrader:
+    # Minimum number of seconds between two scouting status lines on the console
+    CONSOLE_STATUS_INTERVAL = 5
+
     def __init__(
         self,
         binance_manager: BinanceAPIManager,
@@ -22,17 +27,24 @@ class AutoTrader:
         self.db = database
         self.logger = logger
         self.config = config
+        # Pairs by from-coin symbol, only dropped when the trade thresholds are rewritten
+        self._pairs_cache: Dict[str, List[Pair]] = {}
+        # Fees only move with the BNB discount and balances, so each pair's fee factor is reused for a minute
+        self._fee_factor_cache: TTLCache = TTLCache(maxsize=1000, ttl=60)
+        self._last_console_status = 0.0
 
     def initialize(self):
         self.initialize_trade_thresholds()
 
-    def transaction_through_bridge(self, pair: Pair):
+    def transaction_through_bridge(self, pair: Pair, from_coin_price: float = None):
         """
-        Jump from the source coin to the destination coin through bridge coin
+        Jump from the source coin to the destination coin through bridge coin.
+        from_coin_price is fetched when the caller doesn't already have it.
         """
         can_sell = False
         balance = self.manager.get_currency_balance(pair.from_coin.symbol)
-        from_coin_price = self.manager.get_ticker_price(pair.from_coin + self.config.BRIDGE)
+        if from_coin_price is None:
+            from_coin_price = self.manager.get_ticker_price(pair.from_coin + self.config.BRIDGE)
 
         if balance and balance * from_coin_price > self.manager.get_min_notional(
             pair.from_coin.symbol, self.config.BRIDGE.symbol
@@ -46,6 +58,8 @@ class AutoTrader:
             return None
 
         result = self.manager.buy_alt(pair.to_coin, self.config.BRIDGE)
+        # Balances changed, so the BNB fee discount may have too
+        self._fee_factor_cache.clear()
         if result is not None:
             self.db.set_current_coin(pair.to_coin)
             self.update_trade_threshold(pair.to_coin, result.price)
@@ -63,6 +77,7 @@ class AutoTrader:
             self.logger.info(f"Skipping update... current coin {coin + self.config.BRIDGE} not found")
             return
 
+        self._pairs_cache.clear()
         session: Session
         with self.db.db_session() as session:
             for pair in session.query(Pair).filter(Pair.to_coin == coin):
@@ -78,6 +93,7 @@ class AutoTrader:
         """
         Initialize the buying threshold of all the coins for trading between them
         """
+        self._pairs_cache.clear()
         session: Session
         with self.db.db_session() as session:
             for pair in session.query(Pair).filter(Pair.ratio.is_(None)).all():
@@ -103,14 +119,57 @@ class AutoTrader:
         """
         raise NotImplementedError()
 
+    def _show_scouting_status(self, coin: Coin):
+        """
+        Display on the console the coin being scouted, so users can see *some* activity and not think the bot has
+        stopped. Not logging though to reduce log size, and throttled so fast scouting doesn't flood stdout.
+        """
+        now = time.monotonic()
+        if now - self._last_console_status < self.CONSOLE_STATUS_INTERVAL:
+            return
+        self._last_console_status = now
+        print(
+            f"{datetime.now()} - CONSOLE - INFO - I am scouting the best trades. "
+            f"Current coin: {coin + self.config.BRIDGE} ",
+            end="\r",
+        )
+
+    def _get_pairs_from(self, coin: Coin) -> List[Pair]:
+        """
+        Cached version of Database.get_pairs_from
+        """
+        pairs = self._pairs_cache.get(coin.symbol)
+        if pairs is None:
+            pairs = self._pairs_cache[coin.symbol] = self.db.get_pairs_from(coin)
+        return pairs
+
+    def _get_fee_factor(self, pair: Pair) -> float:
+        """
+        Share of the (current coin)/(optional coin) ratio that is left once the fees for jumping along
+        the pair are paid, weighted by SCOUT_MULTIPLIER unless scouting by margin
+        """
+        key = (pair.from_coin_id, pair.to_coin_id)
+        fee_factor = self._fee_factor_cache.get(key)
+        if fee_factor is None:
+            from_fee = self.manager.get_fee(pair.from_coin, self.config.BRIDGE, True)
+            to_fee = self.manager.get_fee(pair.to_coin, self.config.BRIDGE, False)
+            transaction_fee = from_fee + to_fee - from_fee * to_fee
+            if self.config.USE_MARGIN != "yes":
+                transaction_fee *= self.config.SCOUT_MULTIPLIER
+            fee_factor = self._fee_factor_cache[key] = 1 - transaction_fee
+        return fee_factor
+
     def _get_ratios(self, coin: Coin, coin_price):
         """
-        Given a coin, get the current price ratio for every other enabled coin
+        Given a coin, get the current price ratio for every other enabled coin.
+        Coins that can't come out ahead even before fees are left out.
         """
         ratio_dict: Dict[Pair, float] = {}
+        use_margin = self.config.USE_MARGIN == "yes"
+        margin = 1 + self.config.SCOUT_MARGIN / 100
 
-        for pair in self.db.get_pairs_from(coin):
-            optional_coin_price = self.manager.get_ticker_price(pair.to_coin + self.config.BRIDGE)
+        for pair in self._get_pairs_from(coin):
+            optional_coin_price = self.manager.get_ticker_price(pair.to_coin_id + self.config.BRIDGE_SYMBOL)
 
             if optional_coin_price is None:
                 self.logger.info(f"Skipping scouting... optional coin {pair.to_coin + self.config.BRIDGE} not found")
@@ -121,19 +180,19 @@ class AutoTrader:
             # Obtain (current coin)/(optional coin)
             coin_opt_coin_ratio = coin_price / optional_coin_price
 
-            # Fees
-            from_fee = self.manager.get_fee(pair.from_coin, self.config.BRIDGE, True)
-            to_fee = self.manager.get_fee(pair.to_coin, self.config.BRIDGE, False)
-            transaction_fee = from_fee + to_fee - from_fee * to_fee
+            # Fees can only lower the ratio, so skip looking them up when it isn't positive without them
+            if use_margin:
+                fee_free_ratio = coin_opt_coin_ratio / pair.ratio - margin
+            else:
+                fee_free_ratio = coin_opt_coin_ratio - pair.ratio
+            if fee_free_ratio <= 0:
+                continue
 
-            if self.config.USE_MARGIN == "yes":
-                ratio_dict[pair] = (
-                    (1 - transaction_fee) * coin_opt_coin_ratio / pair.ratio - 1 - self.config.SCOUT_MARGIN / 100
-                )
+            fee_factor = self._get_fee_factor(pair)
+            if use_margin:
+                ratio_dict[pair] = fee_factor * coin_opt_coin_ratio / pair.ratio - margin
             else:
-                ratio_dict[pair] = (
-                    coin_opt_coin_ratio - transaction_fee * self.config.SCOUT_MULTIPLIER * coin_opt_coin_ratio
-                ) - pair.ratio
+                ratio_dict[pair] = fee_factor * coin_opt_coin_ratio - pair.ratio
         return ratio_dict
 
     def _jump_to_best_coin(self, coin: Coin, coin_price: float):
@@ -149,7 +208,7 @@ class AutoTrader:
         if ratio_dict:
             best_pair = max(ratio_dict, key=ratio_dict.get)
             self.logger.info(f"Will be jumping from {coin} to {best_pair.to_coin_id}")
-            self.transaction_through_bridge(best_pair)
+            self.transaction_through_bridge(best_pair, coin_price)
 
     def bridge_scout(self):
         """
@@ -158,18 +217,21 @@ class AutoTrader:
         bridge_balance = self.manager.get_currency_balance(self.config.BRIDGE.symbol)
 
         for coin in self.db.get_coins():
-            current_coin_price = self.manager.get_ticker_price(coin + self.config.BRIDGE)
+            current_coin_price = self.manager.get_ticker_price(coin.symbol + self.config.BRIDGE_SYMBOL)
 
             if current_coin_price is None:
                 continue
 
+            # Only work out the ratios of coins we could actually buy
+            if bridge_balance <= self.manager.get_min_notional(coin.symbol, self.config.BRIDGE.symbol):
+                continue
+
             ratio_dict = self._get_ratios(coin, current_coin_price)
             if not any(v > 0 for v in ratio_dict.values()):
-                # There will only be one coin where all the ratios are negative. When we find it, buy it if we can
-                if bridge_balance > self.manager.get_min_notional(coin.symbol, self.config.BRIDGE.symbol):
-                    self.logger.info(f"Will be purchasing {coin} using bridge coin")
-                    self.manager.buy_alt(coin, self.config.BRIDGE)
-                    return coin
+                # There will only be one coin where all the ratios are negative. When we find it, buy it
+                self.logger.info(f"Will be purchasing {coin} using bridge coin")
+                self.manager.buy_alt(coin, self.config.BRIDGE)
+                return coin
         return None
 
     def update_values(self):
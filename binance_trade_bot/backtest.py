@@ -1,7 +1,7 @@
 from collections import defaultdict
 from datetime import datetime, timedelta
 from traceback import format_exc
-from typing import Dict
+from typing import Dict, Optional
 
 from sqlitedict import SqliteDict
 
@@ -29,6 +29,8 @@ class MockBinanceManager(BinanceAPIManager):
         self.config = config
         self.datetime = start_date or datetime(2021, 1, 1)
         self.balances = start_balances or {config.BRIDGE.symbol: 100}
+        self._target_date: Optional[str] = None
+        self._target_date_for: Optional[datetime] = None
 
     def setup_websockets(self):
         pass  # No websockets are needed for backtesting
@@ -43,13 +45,15 @@ class MockBinanceManager(BinanceAPIManager):
         """
         Get ticker price of a specific coin
         """
-        target_date = self.datetime.strftime("%d %b %Y %H:%M:%S")
+        # Many tickers are priced per tick, only format the simulated time once per tick
+        if self._target_date_for != self.datetime:
+            self._target_date = self.datetime.strftime("%d %b %Y %H:%M:%S")
+            self._target_date_for = self.datetime
+        target_date = self._target_date
         key = f"{ticker_symbol} - {target_date}"
         val = cache.get(key, None)
         if val is None:
-            end_date = self.datetime + timedelta(minutes=1000)
-            if end_date > datetime.now():
-                end_date = datetime.now()
+            end_date = min(self.datetime + timedelta(minutes=1000), datetime.now())
             end_date = end_date.strftime("%d %b %Y %H:%M:%S")
             self.logger.info(f"Fetching prices for {ticker_symbol} between {self.datetime} and {end_date}")
             for result in self.binance_client.get_historical_klines(
@@ -134,7 +138,7 @@ class MockBinanceManager(BinanceAPIManager):
 
 class MockDatabase(Database):
     def __init__(self, logger: Logger, config: Config):
-        super().__init__(logger, config, "sqlite:///")
+        super().__init__(logger, config, "sqlite:///", live=False)
 
     def log_scout(
         self,
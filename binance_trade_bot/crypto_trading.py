@@ -40,6 +40,7 @@ def main():
 
     schedule = SafeScheduler(logger)
     schedule.every(config.SCOUT_SLEEP_TIME).seconds.do(trader.scout).tag("scouting")
+    schedule.every(config.SCOUT_SLEEP_TIME).seconds.do(db.flush_scout_buffer).tag("writing scout history")
     schedule.every(1).minutes.do(trader.update_values).tag("updating value history")
     schedule.every(1).minutes.do(db.prune_scout_history).tag("pruning scout history")
     schedule.every(1).hours.do(db.prune_value_history).tag("pruning value history")
@@ -48,4 +49,5 @@ def main():
             schedule.run_pending()
             time.sleep(1)
     finally:
+        db.flush_scout_buffer()
         manager.stream_manager.close()
\ No newline at end of file
@@ -1,14 +1,16 @@
 import json
 import os
+import queue
+import threading
 import time
 from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 from socketio import Client
 from socketio.exceptions import ConnectionError as SocketIOConnectionError
-from sqlalchemy import create_engine, func
-from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy import and_, create_engine, event, func, insert, or_, select
+from sqlalchemy.orm import Session, joinedload, sessionmaker
 
 from .config import Config
 from .logger import Logger
@@ -16,16 +18,45 @@ from .models import *  # pylint: disable=wildcard-import
 
 
 class Database:
-    def __init__(self, logger: Logger, config: Config, uri="sqlite:///data/crypto_trading.db"):
+    # Number of buffered scout history rows that triggers a write
+    SCOUT_FLUSH_EVERY = 500
+    # Seconds to wait before trying to reconnect to the api server after a failed attempt
+    SOCKETIO_RETRY_DELAY = 60
+
+    def __init__(self, logger: Logger, config: Config, uri="sqlite:///data/crypto_trading.db", live=True):
         self.logger = logger
         self.config = config
         self.engine = create_engine(uri)
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", self._set_sqlite_pragmas)
         self.SessionMaker = sessionmaker(bind=self.engine)
-        self.socketio_client = Client()
+        # Without a live frontend (e.g. when backtesting) updates are never sent
+        self.live = live
+        self.socketio_client = Client() if live else None
+        self._socketio_retry_at = 0.0
+        self._emit_queue: queue.Queue = queue.Queue(maxsize=1000)
+        self._emit_thread: Optional[threading.Thread] = None
+        # Coins only change in set_coins, which clears both caches
+        self._coin_cache: Dict[str, Coin] = {}
+        self._coins_cache: Dict[bool, List[Coin]] = {}
+        self._scout_buffer: List[dict] = []
+
+    @staticmethod
+    def _set_sqlite_pragmas(dbapi_connection, _connection_record):
+        # WAL with synchronous=NORMAL avoids an fsync on every commit
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.close()
 
     def socketio_connect(self):
         if self.socketio_client.connected and self.socketio_client.namespaces:
             return True
+        if time.monotonic() < self._socketio_retry_at:
+            return False
         try:
             if not self.socketio_client.connected:
                 self.socketio_client.connect("http://api:5123", namespaces=["/backend"])
@@ -33,50 +64,69 @@ class Database:
                 time.sleep(0.1)
             return True
         except SocketIOConnectionError:
+            # Don't try again for a while, updates are dropped until then
+            self._socketio_retry_at = time.monotonic() + self.SOCKETIO_RETRY_DELAY
             return False
 
+    def _emit_worker(self):
+        while True:
+            update = self._emit_queue.get()
+            try:
+                if self.socketio_connect():
+                    self.socketio_client.emit("update", update, namespace="/backend")
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.debug(f"Failed to send update to the api server: {e}")
+
     @contextmanager
     def db_session(self):
         """
         Creates a context with an open SQLAlchemy session.
         """
-        session: Session = scoped_session(self.SessionMaker)
-        yield session
-        session.commit()
-        session.close()
+        session: Session = self.SessionMaker()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
 
     def set_coins(self, symbols: List[str]):
+        self._coin_cache.clear()
+        self._coins_cache.clear()
         session: Session
 
         # Add coins to the database and set them as enabled or not
         with self.db_session() as session:
             # For all the coins in the database, if the symbol no longer appears
             # in the config file, set the coin as disabled
-            coins: List[Coin] = session.query(Coin).all()
-            for coin in coins:
-                if coin.symbol not in symbols:
-                    coin.enabled = False
+            coins: Dict[str, Coin] = {coin.symbol: coin for coin in session.query(Coin).all()}
+            for symbol, coin in coins.items():
+                coin.enabled = symbol in symbols
 
             # For all the symbols in the config file, add them to the database
             # if they don't exist
-            for symbol in symbols:
-                coin = next((coin for coin in coins if coin.symbol == symbol), None)
-                if coin is None:
-                    session.add(Coin(symbol))
-                else:
-                    coin.enabled = True
+            session.add_all(Coin(symbol) for symbol in dict.fromkeys(symbols) if symbol not in coins)
 
         # For all the combinations of coins in the database, add a pair to the database
         with self.db_session() as session:
-            coins: List[Coin] = session.query(Coin).filter(Coin.enabled).all()
-            for from_coin in coins:
-                for to_coin in coins:
-                    if from_coin != to_coin:
-                        pair = session.query(Pair).filter(Pair.from_coin == from_coin, Pair.to_coin == to_coin).first()
-                        if pair is None:
-                            session.add(Pair(from_coin, to_coin))
+            enabled_symbols = [symbol for (symbol,) in session.query(Coin.symbol).filter(Coin.enabled)]
+            existing_pairs = set(session.query(Pair.from_coin_id, Pair.to_coin_id))
+            session.bulk_insert_mappings(
+                Pair,
+                [
+                    {"from_coin_id": from_symbol, "to_coin_id": to_symbol}
+                    for from_symbol in enabled_symbols
+                    for to_symbol in enabled_symbols
+                    if from_symbol != to_symbol and (from_symbol, to_symbol) not in existing_pairs
+                ],
+            )
 
     def get_coins(self, only_enabled=True) -> List[Coin]:
+        coins = self._coins_cache.get(only_enabled)
+        if coins is not None:
+            return list(coins)
         session: Session
         with self.db_session() as session:
             if only_enabled:
@@ -84,23 +134,29 @@ class Database:
             else:
                 coins = session.query(Coin).all()
             session.expunge_all()
-            return coins
+            self._coins_cache[only_enabled] = coins
+            return list(coins)
 
     def get_coin(self, coin: Union[Coin, str]) -> Coin:
         if isinstance(coin, Coin):
             return coin
+        cached_coin = self._coin_cache.get(coin)
+        if cached_coin is not None:
+            return cached_coin
         session: Session
         with self.db_session() as session:
             coin = session.query(Coin).get(coin)
             session.expunge(coin)
+            self._coin_cache[coin.symbol] = coin
             return coin
 
     def set_current_coin(self, coin: Union[Coin, str]):
-        coin = self.get_coin(coin)
+        # Go through the symbol cache so the coin is a clean, already-loaded row that can be
+        # merged without selecting it again
+        coin = self.get_coin(coin.symbol if isinstance(coin, Coin) else coin)
         session: Session
         with self.db_session() as session:
-            if isinstance(coin, Coin):
-                coin = session.merge(coin)
+            coin = session.merge(coin, load=False)
             cc = CurrentCoin(coin)
             session.add(cc)
             self.send_update(cc)
@@ -108,7 +164,12 @@ class Database:
     def get_current_coin(self) -> Optional[Coin]:
         session: Session
         with self.db_session() as session:
-            current_coin = session.query(CurrentCoin).order_by(CurrentCoin.datetime.desc()).first()
+            current_coin = (
+                session.query(CurrentCoin)
+                .options(joinedload(CurrentCoin.coin))
+                .order_by(CurrentCoin.datetime.desc())
+                .first()
+            )
             if current_coin is None:
                 return None
             coin = current_coin.coin
@@ -152,80 +213,104 @@ class Database:
         current_coin_price: float,
         other_coin_price: float,
     ):
+        sh = ScoutHistory(pair, target_ratio, current_coin_price, other_coin_price)
+        self._scout_buffer.append(
+            {
+                "pair_id": pair.id,
+                "target_ratio": sh.target_ratio,
+                "current_coin_price": sh.current_coin_price,
+                "other_coin_price": sh.other_coin_price,
+                "datetime": sh.datetime,
+            }
+        )
+        self.send_update(sh)
+        if len(self._scout_buffer) >= self.SCOUT_FLUSH_EVERY:
+            self.flush_scout_buffer()
+
+    def flush_scout_buffer(self):
+        """
+        Writes the scout history rows buffered by log_scout to the database.
+        """
+        if not self._scout_buffer:
+            return
+        rows, self._scout_buffer = self._scout_buffer, []
         session: Session
         with self.db_session() as session:
-            pair = session.merge(pair)
-            sh = ScoutHistory(pair, target_ratio, current_coin_price, other_coin_price)
-            session.add(sh)
-            self.send_update(sh)
+            session.execute(insert(ScoutHistory), rows)
 
-    def prune_scout_history(self):
-        time_diff = datetime.now() - timedelta(hours=self.config.SCOUT_HISTORY_PRUNE_TIME)
+    def prune_scout_history(self, current_time: datetime = None):
+        """
+        Deletes scout history older than the configured prune time, relative to
+        current_time (wall-clock now when None).
+        """
+        time_diff = (current_time or datetime.now()) - timedelta(hours=self.config.SCOUT_HISTORY_PRUNE_TIME)
         session: Session
         with self.db_session() as session:
-            session.query(ScoutHistory).filter(ScoutHistory.datetime < time_diff).delete()
+            session.query(ScoutHistory).filter(ScoutHistory.datetime < time_diff).delete(synchronize_session=False)
 
-    def prune_value_history(self):
+    def prune_value_history(self, current_time: datetime = None):
+        """
+        Downsamples the coin value history, relative to current_time (wall-clock now when None).
+        """
+        now = current_time or datetime.now()
         session: Session
         with self.db_session() as session:
+            # Tags the first entry for each coin in each bucket with the given interval
+            def tag_first_entries(bucket, interval: Interval):
+                first_ids = select(func.min(CoinValue.id)).group_by(CoinValue.coin_id, bucket)
+                session.query(CoinValue).filter(CoinValue.id.in_(first_ids)).update(
+                    {CoinValue.interval: interval}, synchronize_session=False
+                )
+
             # Sets the first entry for each coin for each hour as 'hourly'
-            hourly_entries: List[CoinValue] = (
-                session.query(CoinValue).group_by(CoinValue.coin_id, func.strftime("%H", CoinValue.datetime)).all()
-            )
-            for entry in hourly_entries:
-                entry.interval = Interval.HOURLY
+            tag_first_entries(func.strftime("%Y-%m-%d %H", CoinValue.datetime), Interval.HOURLY)
 
             # Sets the first entry for each coin for each day as 'daily'
-            daily_entries: List[CoinValue] = (
-                session.query(CoinValue).group_by(CoinValue.coin_id, func.date(CoinValue.datetime)).all()
-            )
-            for entry in daily_entries:
-                entry.interval = Interval.DAILY
+            tag_first_entries(func.date(CoinValue.datetime), Interval.DAILY)
 
             # Sets the first entry for each coin for each month as 'weekly'
             # (Sunday is the start of the week)
-            weekly_entries: List[CoinValue] = (
-                session.query(CoinValue).group_by(CoinValue.coin_id, func.strftime("%Y-%W", CoinValue.datetime)).all()
-            )
-            for entry in weekly_entries:
-                entry.interval = Interval.WEEKLY
-
-            # The last 24 hours worth of minutely entries will be kept, so
-            # count(coins) * 1440 entries
-            time_diff = datetime.now() - timedelta(hours=24)
-            session.query(CoinValue).filter(
-                CoinValue.interval == Interval.MINUTELY, CoinValue.datetime < time_diff
-            ).delete()
+            tag_first_entries(func.strftime("%Y-%W", CoinValue.datetime), Interval.WEEKLY)
 
-            # The last 28 days worth of hourly entries will be kept, so count(coins) * 672 entries
-            time_diff = datetime.now() - timedelta(days=28)
             session.query(CoinValue).filter(
-                CoinValue.interval == Interval.HOURLY, CoinValue.datetime < time_diff
-            ).delete()
-
-            # The last years worth of daily entries will be kept, so count(coins) * 365 entries
-            time_diff = datetime.now() - timedelta(days=365)
-            session.query(CoinValue).filter(
-                CoinValue.interval == Interval.DAILY, CoinValue.datetime < time_diff
-            ).delete()
+                or_(
+                    # The last 24 hours worth of minutely entries will be kept, so
+                    # count(coins) * 1440 entries
+                    and_(CoinValue.interval == Interval.MINUTELY, CoinValue.datetime < now - timedelta(hours=24)),
+                    # The last 28 days worth of hourly entries will be kept, so count(coins) * 672 entries
+                    and_(CoinValue.interval == Interval.HOURLY, CoinValue.datetime < now - timedelta(days=28)),
+                    # The last years worth of daily entries will be kept, so count(coins) * 365 entries
+                    and_(CoinValue.interval == Interval.DAILY, CoinValue.datetime < now - timedelta(days=365)),
+                )
+            ).delete(synchronize_session=False)
 
             # All weekly entries will be kept forever
 
     def create_database(self):
         Base.metadata.create_all(self.engine)
+        # create_all skips existing tables along with their indexes, so add any index
+        # that was introduced after the database was first created
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
 
     def start_trade_log(self, from_coin: Coin, to_coin: Coin, selling: bool):
         return TradeLog(self, from_coin, to_coin, selling)
 
     def send_update(self, model):
-        if not self.socketio_connect():
+        """
+        Queues an update for the frontend, it is emitted from a background thread so that
+        the caller never waits on the socket.io connection.
+        """
+        if not self.live:
             return
-
-        self.socketio_client.emit(
-            "update",
-            {"table": model.__tablename__, "data": model.info()},
-            namespace="/backend",
-        )
+        if self._emit_thread is None:
+            self._emit_thread = threading.Thread(target=self._emit_worker, daemon=True)
+            self._emit_thread.start()
+        try:
+            self._emit_queue.put_nowait({"table": model.__tablename__, "data": model.info()})
+        except queue.Full:
+            pass
 
     def migrate_old_state(self):
         """
@@ -246,13 +331,21 @@ class Database:
                 table: dict = json.load(f)
                 session: Session
                 with self.db_session() as session:
-                    for from_coin, to_coin_dict in table.items():
-                        for to_coin, ratio in to_coin_dict.items():
-                            if from_coin == to_coin:
-                                continue
-                            pair = session.merge(self.get_pair(from_coin, to_coin))
-                            pair.ratio = ratio
-                            session.add(pair)
+                    pair_ids = {
+                        (from_coin_id, to_coin_id): pair_id
+                        for pair_id, from_coin_id, to_coin_id in session.query(
+                            Pair.id, Pair.from_coin_id, Pair.to_coin_id
+                        )
+                    }
+                    session.bulk_update_mappings(
+                        Pair,
+                        [
+                            {"id": pair_ids[(from_coin, to_coin)], "ratio": ratio}
+                            for from_coin, to_coin_dict in table.items()
+                            for to_coin, ratio in to_coin_dict.items()
+                            if from_coin != to_coin
+                        ],
+                    )
 
             os.rename(".current_coin_table", ".current_coin_table.old")
             self.logger.info(".current_coin_table renamed to .current_coin_table.old - " "You can now delete this file")
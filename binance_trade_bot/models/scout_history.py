@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 
@@ -22,6 +22,8 @@ class ScoutHistory(Base):
 
     datetime = Column(DateTime)
 
+    __table_args__ = (Index("ix_scout_history_pair_id_datetime", "pair_id", "datetime"),)
+
     def __init__(
         self,
         pair: Pair,
@@ -1,6 +1,5 @@
 import random
 import sys
-from datetime import datetime
 
 from binance_trade_bot.auto_trader import AutoTrader
 
@@ -15,15 +14,9 @@ class Strategy(AutoTrader):
         Scout for potential jumps from the current coin to another coin
         """
         current_coin = self.db.get_current_coin()
-        # Display on the console, the current coin+Bridge, so users can see *some* activity and not think the bot has
-        # stopped. Not logging though to reduce log size.
-        print(
-            f"{datetime.now()} - CONSOLE - INFO - I am scouting the best trades. "
-            f"Current coin: {current_coin + self.config.BRIDGE} ",
-            end="\r",
-        )
+        self._show_scouting_status(current_coin)
 
-        current_coin_price = self.manager.get_ticker_price(current_coin + self.config.BRIDGE)
+        current_coin_price = self.manager.get_ticker_price(current_coin.symbol + self.config.BRIDGE_SYMBOL)
 
         if current_coin_price is None:
             self.logger.info(f"Skipping scouting... current coin {current_coin + self.config.BRIDGE} not found")
@@ -1,5 +1,3 @@
-from datetime import datetime
-
 from binance_trade_bot.auto_trader import AutoTrader
 
 
@@ -19,7 +17,7 @@ class Strategy(AutoTrader):
 
         for coin in self.db.get_coins():
             current_coin_balance = self.manager.get_currency_balance(coin.symbol)
-            coin_price = self.manager.get_ticker_price(coin + self.config.BRIDGE)
+            coin_price = self.manager.get_ticker_price(coin.symbol + self.config.BRIDGE_SYMBOL)
 
             if coin_price is None:
                 self.logger.info(f"Skipping scouting... current coin {coin + self.config.BRIDGE} not found")
@@ -32,13 +30,7 @@ class Strategy(AutoTrader):
 
             have_coin = True
 
-            # Display on the console, the current coin+Bridge, so users can see *some* activity and not think the bot
-            # has stopped. Not logging though to reduce log size.
-            print(
-                f"{datetime.now()} - CONSOLE - INFO - I am scouting the best trades. "
-                f"Current coin: {coin + self.config.BRIDGE} ",
-                end="\r",
-            )
+            self._show_scouting_status(coin)
 
             self._jump_to_best_coin(coin, coin_price)
 